@@ -0,0 +1,52 @@
+"""
+Fused goodput kernel for plot_timeseries.py
+
+compute_all() turns the stacked cumulative byte counters into rolling goodput,
+per-protocol totals and shares without NumPy's intermediate arrays, running
+over flows (then time steps) in parallel. goodput_and_shares() dispatches
+here once a series reaches NUMBA_MIN_SAMPLES.
+"""
+
+import numba as nb
+import numpy as np
+
+
+@nb.njit(parallel=True, fastmath=True, cache=True)
+def compute_all(cum_bytes, n_tcp, window_samples, dt):
+    """Rolling goodput, per-protocol totals and shares in one pass.
+
+    cum_bytes holds one cumulative byte counter per row, TCP flows first.
+    Returns (gp, tcp_total, nscc_total, nscc_share, cubic_share), matching
+    plot_timeseries.goodput_and_shares.
+    """
+    n_flows, n = cum_bytes.shape
+    scale = 8.0 / (window_samples * dt * 1e3)
+    half = (window_samples - 1) // 2
+    gp = np.empty((n_flows, n))
+    for f in nb.prange(n_flows):
+        for i in range(n):
+            hi = min(i + half, n - 1)
+            lo_prev = max(i + half - window_samples, 0)
+            gp[f, i] = (cum_bytes[f, hi] - cum_bytes[f, lo_prev]) * scale
+
+    tcp_total = np.empty(n)
+    nscc_total = np.empty(n)
+    nscc_share = np.empty(n)
+    cubic_share = np.empty(n)
+    for i in nb.prange(n):
+        a = 0.0
+        for f in range(n_tcp):
+            a += gp[f, i]
+        b = 0.0
+        for f in range(n_tcp, n_flows):
+            b += gp[f, i]
+        tcp_total[i] = a
+        nscc_total[i] = b
+        total = a + b
+        if total > 1e-9:
+            nscc_share[i] = 100.0 * b / total
+            cubic_share[i] = 100.0 * a / total
+        else:
+            nscc_share[i] = np.nan
+            cubic_share[i] = np.nan
+    return gp, tcp_total, nscc_total, nscc_share, cubic_share
@@ -0,0 +1,86 @@
+"""
+Numba-compiled statistics kernels for analyze_fairness.py
+
+Only imported for experiments with many flows; numba is optional and the
+NumPy implementations in analyze_fairness.py are used when it is missing.
+All functions take a contiguous float64 array.
+"""
+
+import numba as nb
+import numpy as np
+
+
+@nb.njit(cache=True, fastmath=True)
+def jain(x):
+    """Jain's Fairness Index: (sum(x))^2 / (n * sum(x^2))."""
+    n = x.size
+    if n == 0:
+        return 0.0
+    s = 0.0
+    s2 = 0.0
+    for v in x:
+        s += v
+        s2 += v * v
+    if s2 == 0.0:
+        return 1.0
+    return (s * s) / (n * s2)
+
+
+@nb.njit(cache=True)
+def mean_std(x):
+    """Mean and population standard deviation in a single pass (Welford).
+
+    Unlike sum(x^2)/n - mean^2 this does not cancel when the values are
+    nearly equal, so it agrees with np.std for fair allocations.
+    """
+    n = x.size
+    if n == 0:
+        return 0.0, 0.0
+    mean = 0.0
+    m2 = 0.0
+    k = 0
+    for v in x:
+        k += 1
+        delta = v - mean
+        mean += delta / k
+        m2 += delta * (v - mean)
+    return mean, np.sqrt(m2 / n)
+
+
+@nb.njit(cache=True)
+def cv(x):
+    """Coefficient of Variation (population std / mean)."""
+    mean, std = mean_std(x)
+    if mean == 0.0:
+        return 0.0
+    return std / mean
+
+
+@nb.njit(cache=True)
+def percentiles(x, ps):
+    """Linearly interpolated percentiles (same as np.percentile), one sort for all of ps."""
+    out = np.zeros(ps.size)
+    n = x.size
+    if n == 0:
+        return out
+    s = np.sort(x)
+    for i in range(ps.size):
+        k = (n - 1) * ps[i] / 100.0
+        f = int(k)
+        c = f + 1 if f + 1 < n else f
+        out[i] = s[f] + (s[c] - s[f]) * (k - f)
+    return out
+
+
+if __name__ == '__main__':
+    # Equivalence check against the NumPy path: python3 _stats.py
+    from analyze_fairness import calculate_cv
+
+    samples = {
+        'constant': np.full(128, 97.3),
+        'random': np.random.default_rng(0).uniform(1.0, 100.0, 100000),
+    }
+    for name, x in samples.items():
+        got, want = cv(x), calculate_cv(x)
+        assert abs(got - want) <= 1e-12, f"{name}: cv {got} != calculate_cv {want}"
+        print(f"{name}: cv {got:.6g} matches calculate_cv {want:.6g}")
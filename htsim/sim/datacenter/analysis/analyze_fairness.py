@@ -14,104 +14,128 @@ Usage: python3 analyze_fairness.py <results_dir>
 import sys
 import os
 import re
-import glob
+import mmap
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import csv
 
+import numpy as np
+
+# NSCC format: "Flow Uec_X_Y flowId Z uecSrc W finished at T total messages M total packets P ... total bytes B ..."
+_NSCC_RE = re.compile(rb'Flow\s+\S+\s+flowId\s+(\d+)\s+\S+\s+\d+\s+finished\s+at\s+([\d.]+)\s+[^\n]*?total\s+bytes\s+(\d+)')
+# TCP Cubic format: "Flow tcpsrc finished at T" (T in ms)
+_CUBIC_RE = re.compile(rb'Flow\s+\S+\s+finished\s+at\s+([\d.]+)')
+_SIZE_RE = re.compile(rb'Setting flow size to (\d+)')
+_LOG_NAME_RE = re.compile(r'(nscc|cubic)_(.+)_(fairness_.+)\.log')
+
+# Experiments with at least this many flows use the numba kernels in _stats.py
+NUMBA_MIN_FLOWS = 100000
+FCT_PERCENTILES = np.array([50.0, 95.0, 99.0])
+_numba_stats = None
+
+def load_numba_stats():
+    """Import the numba kernels on first use. Returns None if numba is not installed."""
+    global _numba_stats
+    if _numba_stats is None:
+        try:
+            import _stats
+            _numba_stats = _stats
+        except ImportError:
+            _numba_stats = False
+    return _numba_stats or None
+
+@contextmanager
+def map_log(log_path):
+    """Memory-map a log file read-only so the regexes scan it without a copy."""
+    with open(log_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+def has_finished_flows(content):
+    """Cheap substring scan: logs without a single 'finished at' line need no regex pass."""
+    return content.find(b'finished at') != -1
+
+def make_flows(flow_id, size, fct_ms, fct_us):
+    """Build the per-flow table returned by the parsers: one array per field."""
+    size = np.asarray(size, dtype=np.int64)
+    fct_us = np.asarray(fct_us, dtype=np.float64)
+    throughput_mbps = np.zeros_like(fct_us)
+    np.divide(size * 8, fct_us, out=throughput_mbps, where=fct_us > 0)  # Mbps
+    return {
+        'flow_id': np.asarray(flow_id, dtype=np.int64),
+        'size': size,
+        'fct_ms': np.asarray(fct_ms, dtype=np.float64),
+        'throughput_mbps': throughput_mbps,
+    }
+
 def parse_nscc_log(log_path):
     """Parse NSCC (UEC) log file to extract flow completion times and throughputs."""
-    flows = []
-
-    with open(log_path, 'r') as f:
-        for line in f:
-            # NSCC format: "Flow Uec_X_Y flowId Z uecSrc W finished at T total messages M total packets P ... total bytes B ..."
-            match = re.search(r'Flow\s+\S+\s+flowId\s+(\d+)\s+\S+\s+\d+\s+finished\s+at\s+([\d.]+)\s+.*total\s+bytes\s+(\d+)', line)
-            if match:
-                flow_id = int(match.group(1))
-                fct_us = float(match.group(2))  # microseconds
-                total_bytes = int(match.group(3))
-                fct_ms = fct_us / 1000.0  # convert to milliseconds
-                throughput_mbps = (total_bytes * 8) / (fct_us) if fct_us > 0 else 0  # Mbps
-                flows.append({
-                    'flow_id': flow_id,
-                    'size': total_bytes,
-                    'fct_ms': fct_ms,
-                    'throughput_mbps': throughput_mbps
-                })
-
-    return flows
+    flow_ids = []
+    sizes = []
+    fcts_us = []
+
+    with map_log(log_path) as content:
+        if not has_finished_flows(content):
+            return make_flows([], [], [], [])
+        for match in _NSCC_RE.finditer(content):
+            flow_ids.append(int(match.group(1)))
+            fcts_us.append(float(match.group(2)))  # microseconds
+            sizes.append(int(match.group(3)))
+
+    fct_us = np.array(fcts_us, dtype=np.float64)
+    return make_flows(flow_ids, sizes, fct_us / 1000.0, fct_us)
 
 def parse_cubic_log(log_path):
     """Parse TCP Cubic log file to extract flow completion times and throughputs."""
-    flows = []
-
     # First, try to find flow size from "Setting flow size" lines
     flow_size = 2000000  # default
 
-    with open(log_path, 'r') as f:
-        content = f.read()
+    with map_log(log_path) as content:
+        if not has_finished_flows(content):
+            return make_flows([], [], [], [])
 
         # Find flow size
-        size_match = re.search(r'Setting flow size to (\d+)', content)
+        size_match = _SIZE_RE.search(content)
         if size_match:
             flow_size = int(size_match.group(1))
 
-        # TCP Cubic format: "Flow tcpsrc finished at T" (T in ms)
-        flow_id = 1
-        for match in re.finditer(r'Flow\s+\S+\s+finished\s+at\s+([\d.]+)', content):
-            fct_ms = float(match.group(1))
-            throughput_mbps = (flow_size * 8) / (fct_ms * 1000) if fct_ms > 0 else 0  # Mbps
-            flows.append({
-                'flow_id': flow_id,
-                'size': flow_size,
-                'fct_ms': fct_ms,
-                'throughput_mbps': throughput_mbps
-            })
-            flow_id += 1
-
-    return flows
+        fct_ms = np.array([float(match.group(1)) for match in _CUBIC_RE.finditer(content)],
+                          dtype=np.float64)
+    n = fct_ms.size
+    return make_flows(np.arange(1, n + 1), np.full(n, flow_size), fct_ms, fct_ms * 1000)
 
 def calculate_jains_fairness(values):
     """Calculate Jain's Fairness Index."""
-    if not values or len(values) == 0:
+    if values.size == 0:
         return 0
-    n = len(values)
-    sum_x = sum(values)
-    sum_x_sq = sum(x*x for x in values)
+    sum_x = values.sum()
+    sum_x_sq = np.dot(values, values)
     if sum_x_sq == 0:
         return 1.0
-    return (sum_x * sum_x) / (n * sum_x_sq)
+    return float(sum_x * sum_x / (values.size * sum_x_sq))
 
 def calculate_cv(values):
     """Calculate Coefficient of Variation."""
-    if not values or len(values) == 0:
+    if values.size == 0:
         return 0
-    mean = sum(values) / len(values)
+    mean = values.mean()
     if mean == 0:
         return 0
-    variance = sum((x - mean)**2 for x in values) / len(values)
-    std = variance ** 0.5
-    return std / mean
+    return float(values.std() / mean)
 
 def calculate_min_max_ratio(values):
     """Calculate min/max ratio."""
-    if not values or len(values) == 0:
+    if values.size == 0:
         return 0
-    min_val = min(values)
-    max_val = max(values)
+    max_val = values.max()
     if max_val == 0:
         return 1.0
-    return min_val / max_val
-
-def percentile(values, p):
-    """Calculate percentile."""
-    if not values:
-        return 0
-    sorted_vals = sorted(values)
-    k = (len(sorted_vals) - 1) * p / 100
-    f = int(k)
-    c = f + 1 if f + 1 < len(sorted_vals) else f
-    return sorted_vals[f] + (sorted_vals[c] - sorted_vals[f]) * (k - f)
+    return float(values.min() / max_val)
 
 def analyze_experiment(log_path, protocol):
     """Analyze a single experiment log file."""
@@ -120,26 +144,42 @@ def analyze_experiment(log_path, protocol):
     else:
         flows = parse_cubic_log(log_path)
 
-    if not flows:
+    throughputs = flows['throughput_mbps']
+    fcts = flows['fct_ms']
+    num_flows = fcts.size
+
+    if num_flows == 0:
         return None
 
-    throughputs = [f['throughput_mbps'] for f in flows]
-    fcts = [f['fct_ms'] for f in flows]
+    stats = load_numba_stats() if num_flows >= NUMBA_MIN_FLOWS else None
+    if stats:
+        jains = float(stats.jain(throughputs))
+        cv = float(stats.cv(throughputs))
+        fct_p50, fct_p95, fct_p99 = stats.percentiles(fcts, FCT_PERCENTILES)
+    else:
+        jains = calculate_jains_fairness(throughputs)
+        cv = calculate_cv(throughputs)
+        fct_p50, fct_p95, fct_p99 = np.percentile(fcts, FCT_PERCENTILES)
 
     return {
-        'num_flows': len(flows),
-        'jains_fairness': calculate_jains_fairness(throughputs),
-        'cv': calculate_cv(throughputs),
+        'num_flows': num_flows,
+        'jains_fairness': jains,
+        'cv': cv,
         'min_max_ratio': calculate_min_max_ratio(throughputs),
-        'mean_throughput_mbps': sum(throughputs) / len(throughputs) if throughputs else 0,
-        'fct_p50_ms': percentile(fcts, 50),
-        'fct_p95_ms': percentile(fcts, 95),
-        'fct_p99_ms': percentile(fcts, 99),
-        'fct_mean_ms': sum(fcts) / len(fcts) if fcts else 0,
-        'fct_min_ms': min(fcts) if fcts else 0,
-        'fct_max_ms': max(fcts) if fcts else 0,
+        'mean_throughput_mbps': float(throughputs.mean()),
+        'fct_p50_ms': float(fct_p50),
+        'fct_p95_ms': float(fct_p95),
+        'fct_p99_ms': float(fct_p99),
+        'fct_mean_ms': float(fcts.mean()),
+        'fct_min_ms': float(fcts.min()),
+        'fct_max_ms': float(fcts.max()),
     }
 
+def analyze_task(task):
+    """Process-pool worker: analyze one (log_path, key, protocol) task."""
+    log_path, key, protocol = task
+    return log_path, key, protocol, analyze_experiment(log_path, protocol)
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python3 analyze_fairness.py <results_dir>")
@@ -152,32 +192,35 @@ def main():
         sys.exit(1)
 
     # Find all log files
-    log_files = glob.glob(os.path.join(results_dir, "*.log"))
+    with os.scandir(results_dir) as it:
+        log_files = [e.path for e in it if e.name.endswith('.log') and e.is_file()]
 
     if not log_files:
         print(f"No log files found in {results_dir}")
         sys.exit(1)
 
     # Parse experiment names and group by topology/workload
-    results = defaultdict(dict)
-
+    tasks = []
     for log_path in log_files:
-        filename = os.path.basename(log_path)
         # Parse filename: protocol_topology_workload.log
-        match = re.match(r'(nscc|cubic)_(.+)_(fairness_.+)\.log', filename)
+        match = _LOG_NAME_RE.match(os.path.basename(log_path))
         if match:
             protocol = match.group(1).upper()
             topology = match.group(2)
             workload = match.group(3)
+            tasks.append((log_path, f"{topology}/{workload}", protocol))
 
-            key = f"{topology}/{workload}"
-            metrics = analyze_experiment(log_path, protocol)
+    results = defaultdict(dict)
 
+    # Simulator logs run to hundreds of MB and each regex scan holds a core,
+    # so parse one log per worker process
+    with ProcessPoolExecutor() as executor:
+        for log_path, key, protocol, metrics in executor.map(analyze_task, tasks):
             if metrics:
                 results[key][protocol] = metrics
                 print(f"Analyzed: {protocol} - {key} ({metrics['num_flows']} flows)")
             else:
-                print(f"Warning: No flows found in {filename}")
+                print(f"Warning: No flows found in {os.path.basename(log_path)}")
 
     if not results:
         print("No valid results found")
@@ -232,7 +275,7 @@ def main():
             rows.append(row)
 
         # Print table
-        col_widths = [max(len(str(row[i])) for row in [headers] + rows) for i in range(5)]
+        col_widths = [max(map(len, col)) for col in zip(headers, *rows)]
         fmt_str = "  ".join(f"{{:<{w}}}" for w in col_widths)
 
         print(fmt_str.format(*headers))
@@ -9,47 +9,46 @@ Usage:
 """
 
 import argparse
-import csv
+import operator
 import os
 import sys
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Column types of the per-flow CSV files written by the mixed experiment
+CSV_DTYPES = {
+    'flow_id': np.int64,
+    'src': np.int32,
+    'dst': np.int32,
+    'size_bytes': np.int64,
+    'start_us': np.float64,
+    'fct_us': np.float64,
+    'throughput_gbps': np.float64,
+    'finished': np.int8,
+    'bytes_received': np.int64,
+    'retransmits': np.int32,
+    'protocol': 'category',
+}
 
 
 def read_csv(filepath):
-    """Read a per-flow CSV file and return list of dicts."""
-    rows = []
-    with open(filepath) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            row['flow_id'] = int(row['flow_id'])
-            row['src'] = int(row['src'])
-            row['dst'] = int(row['dst'])
-            row['size_bytes'] = int(row['size_bytes'])
-            row['start_us'] = float(row['start_us'])
-            row['fct_us'] = float(row['fct_us'])
-            row['throughput_gbps'] = float(row['throughput_gbps'])
-            row['finished'] = int(row['finished'])
-            row['bytes_received'] = int(row['bytes_received'])
-            row['retransmits'] = int(row['retransmits'])
-            rows.append(row)
-    return rows
-
-
-def percentile(sorted_vals, p):
-    """Return the p-th percentile from a sorted list."""
-    if not sorted_vals:
-        return 0
-    idx = int(len(sorted_vals) * p / 100.0)
-    idx = min(idx, len(sorted_vals) - 1)
-    return sorted_vals[idx]
+    """Read a per-flow CSV file into a typed DataFrame."""
+    try:
+        return pd.read_csv(filepath, dtype=CSV_DTYPES)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=list(CSV_DTYPES))
 
 
 def jains_fairness(values):
     """Compute Jain's fairness index."""
     if len(values) < 2:
         return 1.0
-    s = sum(values)
-    s2 = sum(v * v for v in values)
+    s = values.sum()
+    s2 = np.dot(values, values)
     n = len(values)
     if s2 == 0:
         return 1.0
@@ -58,21 +57,33 @@ def jains_fairness(values):
 
 def analyze_file(filepath):
     """Analyze a single CSV file and return a summary dict."""
-    rows = read_csv(filepath)
-    if not rows:
+    df = read_csv(filepath)
+    if df.empty:
         return None
 
-    nscc_rows = [r for r in rows if r['protocol'] == 'NSCC']
-    cubic_rows = [r for r in rows if r['protocol'] == 'CUBIC']
-
-    result = {
-        'total_flows': len(rows),
-        'nscc_flows': len(nscc_rows),
-        'cubic_flows': len(cubic_rows),
-    }
-
-    for label, subset in [('nscc', nscc_rows), ('cubic', cubic_rows)]:
-        if not subset:
+    # Totals over every flow, throughput statistics over flows that moved data.
+    # quantile(interpolation='higher') picks sorted[min(int(n * q), n - 1)].
+    df = df.assign(finished=df['finished'].astype(bool))
+    by_proto = df.groupby('protocol', observed=True).agg(
+        flows=('flow_id', 'size'),
+        total_bytes=('bytes_received', 'sum'),
+        finished=('finished', 'sum'),
+        retransmits=('retransmits', 'sum'),
+    )
+    active = df.loc[df['throughput_gbps'] > 0]
+    tputs = active.groupby('protocol', observed=True)['throughput_gbps']
+    tput_stats = tputs.quantile([0.5, 0.99], interpolation='higher').unstack().reindex(columns=[0.5, 0.99])
+    tput_stats.columns = ['median_tput', 'p99_tput']
+    tput_stats['mean_tput'] = tputs.mean()
+    stats = by_proto.join(tput_stats).fillna({'mean_tput': 0, 'median_tput': 0, 'p99_tput': 0})
+    stats = stats.to_dict('index')
+
+    result = {'total_flows': len(df)}
+
+    for label, protocol in [('nscc', 'NSCC'), ('cubic', 'CUBIC')]:
+        row = stats.get(protocol)
+        if row is None:
+            result[f'{label}_flows'] = 0
             result[f'{label}_mean_tput'] = None
             result[f'{label}_median_tput'] = None
             result[f'{label}_p99_tput'] = None
@@ -81,17 +92,13 @@ def analyze_file(filepath):
             result[f'{label}_retransmits'] = 0
             continue
 
-        tputs = sorted([r['throughput_gbps'] for r in subset if r['throughput_gbps'] > 0])
-        total_bytes = sum(r['bytes_received'] for r in subset)
-        finished = sum(1 for r in subset if r['finished'])
-        retx = sum(r['retransmits'] for r in subset)
-
-        result[f'{label}_mean_tput'] = sum(tputs) / len(tputs) if tputs else 0
-        result[f'{label}_median_tput'] = percentile(tputs, 50)
-        result[f'{label}_p99_tput'] = percentile(tputs, 99)
-        result[f'{label}_total_bytes'] = total_bytes
-        result[f'{label}_finished'] = finished
-        result[f'{label}_retransmits'] = retx
+        result[f'{label}_flows'] = row['flows']
+        result[f'{label}_mean_tput'] = row['mean_tput']
+        result[f'{label}_median_tput'] = row['median_tput']
+        result[f'{label}_p99_tput'] = row['p99_tput']
+        result[f'{label}_total_bytes'] = row['total_bytes']
+        result[f'{label}_finished'] = row['finished']
+        result[f'{label}_retransmits'] = row['retransmits']
 
     # Bandwidth share
     total_bytes = result['nscc_total_bytes'] + result['cubic_total_bytes']
@@ -102,9 +109,8 @@ def analyze_file(filepath):
         result['nscc_share'] = 0
         result['cubic_share'] = 0
 
-    # Jain's FI
-    all_tputs = [r['throughput_gbps'] for r in rows if r['throughput_gbps'] > 0]
-    result['jains_fi'] = jains_fairness(all_tputs)
+    # Jain's FI, over the same flows as the throughput statistics
+    result['jains_fi'] = jains_fairness(active['throughput_gbps'].to_numpy())
 
     return result
 
@@ -140,11 +146,8 @@ def main():
     parser.add_argument("--output", default=None, help="Output summary file (also prints to stdout)")
     args = parser.parse_args()
 
-    csv_files = sorted([
-        os.path.join(args.results_dir, f)
-        for f in os.listdir(args.results_dir)
-        if f.endswith('.csv')
-    ])
+    with os.scandir(args.results_dir) as it:
+        csv_files = sorted(e.path for e in it if e.name.endswith('.csv') and e.is_file())
 
     if not csv_files:
         print(f"No CSV files found in {args.results_dir}")
@@ -156,6 +159,14 @@ def main():
         scen = scenario_from_filename(f)
         scenarios[scen].append(f)
 
+    # The per-run CSVs are small, so worker start-up dominates for a single
+    # file; only fan out when there are several to amortise it over
+    if len(csv_files) > 1:
+        with ProcessPoolExecutor() as executor:
+            results = dict(zip(csv_files, executor.map(analyze_file, csv_files)))
+    else:
+        results = {f: analyze_file(f) for f in csv_files}
+
     lines = []
 
     def out(s=""):
@@ -185,9 +196,10 @@ def main():
             f"{'':>7} | {'':>8} | {'':>8}")
         out("-" * 90)
 
-        for fpath in sorted(scenarios[scen], key=lambda x: ratio_from_filename(x)):
-            ratio = ratio_from_filename(fpath)
-            result = analyze_file(fpath)
+        entries = [(ratio_from_filename(fpath), fpath) for fpath in scenarios[scen]]
+        entries.sort(key=operator.itemgetter(0))
+        for ratio, fpath in entries:
+            result = results[fpath]
             if result is None:
                 continue
 
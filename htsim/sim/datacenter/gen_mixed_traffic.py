@@ -22,11 +22,10 @@ def write_cm(filepath, nodes, connections):
 
     connections: list of (src, dst, start_us, size_bytes, flow_id)
     """
+    body = "".join(f"{src}->{dst} id {fid} start {start_us} size {size_bytes}\n"
+                   for src, dst, start_us, size_bytes, fid in connections)
     with open(filepath, 'w') as f:
-        f.write(f"Nodes {nodes}\n")
-        f.write(f"Connections {len(connections)}\n")
-        for src, dst, start_us, size_bytes, fid in connections:
-            f.write(f"{src}->{dst} id {fid} start {start_us} size {size_bytes}\n")
+        f.write(f"Nodes {nodes}\nConnections {len(connections)}\n{body}")
     print(f"  Written {len(connections)} connections to {filepath}")
 
 
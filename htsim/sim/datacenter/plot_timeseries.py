@@ -12,6 +12,8 @@ Usage:
     python3 plot_timeseries.py <timeseries_csv> [output_png]
 """
 
+import functools
+import os
 import sys
 import re
 import numpy as np
@@ -19,8 +21,50 @@ import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # non-interactive backend for headless rendering
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 from matplotlib.ticker import FuncFormatter
 
+# Columns the plots read; everything else in the CSV is skipped at parse time
+BASE_COLUMNS = ('time_us', 'queue_bytes', 'queue_drops')
+# Per-flow columns: (protocol, flow index, kind), e.g. 'nscc3_bytes'
+FLOW_COLUMN_RE = re.compile(r'^(tcp|nscc)(\d+)_(cwnd|bytes|bytes_acked)$')
+
+# Series with at least this many flow samples use the numba kernel in _timeseries_kernels.py
+NUMBA_MIN_SAMPLES = 10_000_000
+
+
+@functools.lru_cache(maxsize=None)
+def load_numba_kernels():
+    """Return the _timeseries_kernels module, or None when numba can't be imported.
+
+    Deferred so that numba's import and JIT start-up are only paid by plots
+    large enough to dispatch to it; the result is remembered either way.
+    """
+    try:
+        import _timeseries_kernels
+    except ImportError:
+        return None
+    return _timeseries_kernels
+
+
+def _kfmt(x, _):
+    """Tick label for microseconds, as 'XXk' from 1000 up."""
+    return f'{x/1000:.0f}k' if x >= 1000 else f'{x:.0f}'
+
+
+def classify_flow_columns(columns):
+    """Group per-flow columns by (protocol, kind) in a single pass.
+
+    Returns a dict such as {('tcp', 'cwnd'): ['tcp0_cwnd', 'tcp1_cwnd', ...]}
+    with each list ordered by flow index, whatever the CSV column order.
+    """
+    by_kind = {}
+    for c in columns:
+        m = FLOW_COLUMN_RE.match(c)
+        if m:
+            by_kind.setdefault((m[1], m[3]), []).append((int(m[2]), c))
+    return {k: [c for _, c in sorted(v)] for k, v in by_kind.items()}
+
 
 def parse_metadata(csv_path):
     """Parse the '# key=value ...' metadata line at the top of the CSV."""
@@ -28,11 +72,102 @@ def parse_metadata(csv_path):
     with open(csv_path, 'r') as f:
         first_line = f.readline().strip()
     if first_line.startswith('#'):
-        for m in re.finditer(r'(\w+)=([\d.eE+\-]+)', first_line):
-            meta[m.group(1)] = float(m.group(2))
+        for tok in first_line.lstrip('#').split():
+            key, sep, value = tok.partition('=')
+            if sep:
+                try:
+                    meta[key] = float(value)
+                except ValueError:
+                    pass  # non-numeric metadata is not used by the plots
     return meta
 
 
+def read_timeseries(csv_path):
+    """Load the plotted columns of the CSV as float64, skipping the comment line.
+
+    The parsed frame is cached next to the CSV as '<csv_path>.h5' and reused
+    while it is newer than the CSV, so re-plotting skips the CSV parse.
+    Caching needs PyTables; without it the CSV is parsed every time.
+    """
+    cache_path = csv_path + '.h5'
+    try:
+        if os.path.getmtime(cache_path) > os.path.getmtime(csv_path):
+            return pd.read_hdf(cache_path, 'ts')
+    except (OSError, ImportError, KeyError, ValueError, RuntimeError):
+        # Missing cache, no PyTables, wrong key/format, or a corrupt file
+        # (PyTables' HDF5ExtError is a RuntimeError): fall back to the CSV
+        pass
+
+    header = pd.read_csv(csv_path, comment='#', nrows=0).columns
+    usecols = [c for c in header if c in BASE_COLUMNS or FLOW_COLUMN_RE.match(c)]
+    df = pd.read_csv(csv_path, comment='#', usecols=usecols, dtype=np.float64, engine='c')
+
+    try:
+        df.to_hdf(cache_path, key='ts', mode='w', format='fixed', complevel=0)
+    except ImportError:
+        pass  # PyTables not installed
+    except OSError as e:
+        print(f"Note: could not cache parsed CSV to {cache_path} ({e})")
+    return df
+
+
+def rolling_goodput_gbps(cum_bytes, window_samples, dt):
+    """Convert cumulative byte counters (one row per flow) to rolling Gbps.
+
+    The window is centered like np.convolve(..., mode='same'). Each row is
+    already a running sum of the per-sample deltas, so a window sum is one
+    subtraction: O(N) regardless of window size.
+    """
+    n = cum_bytes.shape[-1]
+    idx = np.arange(n)
+    hi = np.minimum(idx + (window_samples - 1) // 2, n - 1)
+    lo_prev = np.maximum(idx + (window_samples - 1) // 2 - window_samples, 0)
+    # delta bytes per window -> bytes/us -> Gbps
+    return (cum_bytes[..., hi] - cum_bytes[..., lo_prev]) * (8.0 / (window_samples * dt * 1e3))
+
+
+def goodput_and_shares(cum_bytes, n_tcp, window_samples, dt):
+    """Rolling goodput per flow plus per-protocol totals and shares of the total.
+
+    cum_bytes has one row per flow, TCP flows first. Returns
+    (gp, tcp_total, nscc_total, nscc_share, cubic_share); shares are in
+    percent and NaN where the total goodput is zero.
+    """
+    if cum_bytes.size >= NUMBA_MIN_SAMPLES:
+        kernels = load_numba_kernels()
+        if kernels is not None:
+            return kernels.compute_all(cum_bytes, n_tcp, window_samples, float(dt))
+
+    gp = rolling_goodput_gbps(cum_bytes, window_samples, dt)
+    # gp is already 2-D; an empty slice sums to zeros
+    tcp_total = gp[:n_tcp].sum(axis=0)
+    nscc_total = gp[n_tcp:].sum(axis=0)
+    total = tcp_total + nscc_total
+    with np.errstate(divide='ignore'):
+        inv = np.where(total > 1e-9, 100.0 / total, np.nan)
+    return gp, tcp_total, nscc_total, nscc_total * inv, tcp_total * inv
+
+
+def plot_flow_lines(ax, t, series, colors, label_fmt, **kwargs):
+    """Draw one line per flow as a single LineCollection artist.
+
+    Flow i uses colors[i % len(colors)]. The legend gets one proxy entry per
+    color, labelled with the flow indices drawn in that color. The traces are
+    rasterized so vector outputs (PDF/SVG) don't carry every vertex.
+    """
+    n = len(series)
+    if n == 0:
+        return
+    segments = [np.column_stack([t, y]) for y in series]
+    ax.add_collection(LineCollection(segments, colors=[colors[i % len(colors)] for i in range(n)],
+                                     zorder=2, rasterized=True, **kwargs))
+    ax.autoscale_view()
+    for k in range(min(n, len(colors))):
+        ids = list(range(k, n, len(colors)))
+        flows = ', '.join(map(str, ids)) if len(ids) <= 3 else f'{ids[0]}, {ids[1]}, ... ({len(ids)} flows)'
+        ax.plot([], [], color=colors[k], label=label_fmt.format(flows), **kwargs)
+
+
 def infer_tcp_ecn_from_filename(path):
     """Best-effort fallback when CSV metadata doesn't include tcp_ecn."""
     lower = path.lower()
@@ -53,8 +188,8 @@ def main():
 
     # Read metadata from comment line, then load data (skip comment)
     meta = parse_metadata(csv_path)
-    df = pd.read_csv(csv_path, comment='#')
-    t = df['time_us'].values
+    df = read_timeseries(csv_path)
+    t = df['time_us'].to_numpy(copy=False)
 
     # --- Extract parameters from metadata (with sensible defaults) ---
     Kmin = int(meta.get('ecn_kmin', 37500))
@@ -68,10 +203,11 @@ def main():
         tcp_ecn = infer_tcp_ecn_from_filename(csv_path)
 
     # --- Detect columns dynamically ---
-    tcp_cols = [c for c in df.columns if c.startswith('tcp') and c.endswith('_cwnd')]
-    nscc_cols = [c for c in df.columns if c.startswith('nscc') and c.endswith('_cwnd')]
-    n_tcp = len(tcp_cols)
-    n_nscc = len(nscc_cols)
+    cols_by_kind = classify_flow_columns(df.columns)
+    tcp_cwnd_cols = cols_by_kind.get(('tcp', 'cwnd'), [])
+    nscc_cwnd_cols = cols_by_kind.get(('nscc', 'cwnd'), [])
+    n_tcp = len(tcp_cwnd_cols)
+    n_nscc = len(nscc_cwnd_cols)
 
     # --- Compute rolling goodput (Gbps) ---
     # Use wider smoothing for decision-grade fairness trends.
@@ -79,15 +215,13 @@ def main():
     dt = t[1] - t[0] if len(t) > 1 else 1.0
     window_samples = max(1, int(window_us / dt))
 
-    def rolling_goodput_gbps(bytes_col):
-        """Convert cumulative bytes to rolling Gbps."""
-        b = df[bytes_col].values.astype(np.float64)
-        delta_bytes = np.diff(b, prepend=b[0])
-        # Rolling sum over window
-        kernel = np.ones(window_samples) / window_samples
-        smoothed = np.convolve(delta_bytes, kernel, mode='same')
-        # delta_bytes per sample interval -> bytes/us -> Gbps
-        return smoothed / dt * 8.0 / 1e3
+    # All flows at once: one row per flow (TCP first, then NSCC)
+    byte_cols = cols_by_kind.get(('tcp', 'bytes_acked'), []) + cols_by_kind.get(('nscc', 'bytes'), [])
+    cum_bytes = df[byte_cols].to_numpy(dtype=np.float64, copy=False).T
+    gp, tcp_total_gp, nscc_total_gp, nscc_share, cubic_share = goodput_and_shares(
+        cum_bytes, n_tcp, window_samples, dt)
+    tcp_gp_series = gp[:n_tcp]
+    nscc_gp_series = gp[n_tcp:]
 
     tcp_ecn_label = "unknown"
     if tcp_ecn == 0:
@@ -110,34 +244,28 @@ def main():
     colors_nscc = ['#ff7f0e', '#ffbb78']  # oranges
 
     # Detect major regime shift from queue transition (high queue -> near Kmin queue)
-    q = df['queue_bytes'].values.astype(np.float64)
+    q = df['queue_bytes'].to_numpy(copy=False)
     transition_idx = None
     if len(q) > 2000:
-        for i in range(1000, len(q) - 1000):
-            if np.mean(q[i - 500:i]) > 0.95 * Kmax and np.mean(q[i:i + 500]) < 1.1 * Kmin:
-                transition_idx = i
-                break
+        # Mean of the 500 samples before and after each candidate i, via a prefix sum
+        cq = np.concatenate(([0.0], np.cumsum(q)))
+        i = np.arange(1000, len(q) - 1000)
+        before = (cq[i] - cq[i - 500]) / 500
+        after = (cq[i + 500] - cq[i]) / 500
+        shift = (before > 0.95 * Kmax) & (after < 1.1 * Kmin)
+        if shift.any():
+            transition_idx = int(i[np.argmax(shift)])
     transition_t = t[transition_idx] if transition_idx is not None else None
 
     # ========== Panel 1: Goodput ==========
     ax = axes[0]
-    tcp_gp_series = []
-    nscc_gp_series = []
-    for i in range(n_tcp):
-        gp = rolling_goodput_gbps(f'tcp{i}_bytes_acked')
-        tcp_gp_series.append(gp)
-        ax.plot(t, gp, color=colors_tcp[i % len(colors_tcp)],
-                linewidth=0.6, label=f'TCP Cubic {i}', alpha=0.85)
-    for i in range(n_nscc):
-        gp = rolling_goodput_gbps(f'nscc{i}_bytes')
-        nscc_gp_series.append(gp)
-        ax.plot(t, gp, color=colors_nscc[i % len(colors_nscc)],
-                linewidth=0.6, label=f'NSCC {i}', alpha=0.85)
+    plot_flow_lines(ax, t, tcp_gp_series, colors_tcp, 'TCP Cubic {}', linewidth=0.6, alpha=0.85)
+    plot_flow_lines(ax, t, nscc_gp_series, colors_nscc, 'NSCC {}', linewidth=0.6, alpha=0.85)
     if n_tcp > 0:
-        ax.plot(t, np.sum(np.vstack(tcp_gp_series), axis=0), color=colors_tcp[0],
+        ax.plot(t, tcp_total_gp, color=colors_tcp[0],
                 linewidth=1.2, alpha=0.35, label='TCP total')
     if n_nscc > 0:
-        ax.plot(t, np.sum(np.vstack(nscc_gp_series), axis=0), color=colors_nscc[0],
+        ax.plot(t, nscc_total_gp, color=colors_nscc[0],
                 linewidth=1.2, alpha=0.35, label='NSCC total')
     ax.axhline(y=linkspeed_gbps, color='gray', linestyle=':', linewidth=0.8, alpha=0.5,
                label=f'Link capacity ({linkspeed_gbps:.0f} Gbps)')
@@ -152,8 +280,9 @@ def main():
 
     # ========== Panel 2: Buffer Occupancy (low-priority queue, matches ECN) ==========
     ax = axes[1]
-    ax.fill_between(t, 0, q, alpha=0.35, color='steelblue', label='Queue occupancy (low-pri)')
-    ax.plot(t, q, color='steelblue', linewidth=0.3)
+    ax.fill_between(t, 0, q, alpha=0.35, color='steelblue', label='Queue occupancy (low-pri)',
+                    rasterized=True)
+    ax.plot(t, q, color='steelblue', linewidth=0.3, rasterized=True)
     # ECN threshold markers
     if Kmin > 0:
         ax.axhline(y=Kmin, color='green', linestyle='--', linewidth=1.2,
@@ -177,14 +306,11 @@ def main():
     # ========== Panel 3: Window Evolution (BDP-normalized, log-scale) ==========
     ax = axes[2]
     bdp_safe = max(float(bdp), 1.0)
-    for i in range(n_tcp):
-        cwnd_ratio = df[f'tcp{i}_cwnd'].values.astype(np.float64) / bdp_safe
-        ax.plot(t, cwnd_ratio, color=colors_tcp[i % len(colors_tcp)],
-                linewidth=0.7, label=f'TCP Cubic {i} cwnd/BDP', alpha=0.9)
-    for i in range(n_nscc):
-        cwnd_ratio = df[f'nscc{i}_cwnd'].values.astype(np.float64) / bdp_safe
-        ax.plot(t, cwnd_ratio, color=colors_nscc[i % len(colors_nscc)],
-                linewidth=0.7, label=f'NSCC {i} cwnd/BDP', alpha=0.9)
+    # One row per flow (TCP first, then NSCC); explicit copy so the in-place scale never aliases df
+    cwnd_ratio = df[tcp_cwnd_cols + nscc_cwnd_cols].to_numpy(dtype=np.float64, copy=True).T
+    cwnd_ratio *= 1.0 / bdp_safe
+    plot_flow_lines(ax, t, cwnd_ratio[:n_tcp], colors_tcp, 'TCP Cubic {} cwnd/BDP', linewidth=0.7, alpha=0.9)
+    plot_flow_lines(ax, t, cwnd_ratio[n_tcp:], colors_nscc, 'NSCC {} cwnd/BDP', linewidth=0.7, alpha=0.9)
     ax.axhline(y=1.0, color='gray', linestyle=':', linewidth=0.8, alpha=0.6, label='1x BDP')
     if transition_t is not None:
         ax.axvline(transition_t, color='black', linestyle='--', linewidth=0.8, alpha=0.6)
@@ -197,26 +323,13 @@ def main():
     # ========== Panel 4: Share + Drops ==========
     ax = axes[3]
     if n_tcp > 0 and n_nscc > 0:
-        tcp_total_gp = np.sum(np.vstack(tcp_gp_series), axis=0)
-        nscc_total_gp = np.sum(np.vstack(nscc_gp_series), axis=0)
-        total_gp = tcp_total_gp + nscc_total_gp
-        nscc_share = np.full_like(total_gp, np.nan, dtype=np.float64)
-        cubic_share = np.full_like(total_gp, np.nan, dtype=np.float64)
-        valid = total_gp > 1e-9
-        np.divide(100.0 * nscc_total_gp, total_gp, out=nscc_share, where=valid)
-        np.divide(100.0 * tcp_total_gp, total_gp, out=cubic_share, where=valid)
-
         # Cumulative share (less noisy than instantaneous share).
-        tcp_cum = np.zeros_like(t, dtype=np.float64)
-        nscc_cum = np.zeros_like(t, dtype=np.float64)
-        for i in range(n_tcp):
-            tcp_cum += df[f'tcp{i}_bytes_acked'].values.astype(np.float64)
-        for i in range(n_nscc):
-            nscc_cum += df[f'nscc{i}_bytes'].values.astype(np.float64)
+        # The byte columns are already cumulative, so just sum across flows.
+        tcp_cum = cum_bytes[:n_tcp].sum(axis=0)
+        nscc_cum = cum_bytes[n_tcp:].sum(axis=0)
         cum_total = tcp_cum + nscc_cum
-        cum_nscc_share = np.full_like(cum_total, np.nan, dtype=np.float64)
-        valid_cum = cum_total > 1e-9
-        np.divide(100.0 * nscc_cum, cum_total, out=cum_nscc_share, where=valid_cum)
+        with np.errstate(divide='ignore'):
+            cum_nscc_share = nscc_cum * np.where(cum_total > 1e-9, 100.0 / cum_total, np.nan)
 
         ax.plot(t, nscc_share, color=colors_nscc[0], linewidth=0.9, label='NSCC share (%)')
         ax.plot(t, cubic_share, color=colors_tcp[0], linewidth=0.9, label='Cubic share (%)')
@@ -233,23 +346,21 @@ def main():
                 transform=ax.transAxes, ha='center', va='center', fontsize=9)
         ax.set_ylim(0, 100)
 
-    # Overlay drops on right axis for context (if any)
-    drops = df['queue_drops'].values.astype(np.float64)
-    axd = ax.twinx()
-    if drops.max() > 0:
-        axd.step(t, drops, where='post', color='crimson', linewidth=0.8, alpha=0.35, label='Queue drops')
+    # Overlay drops on right axis for context (only if there are any)
+    max_drops = df['queue_drops'].max()
+    if max_drops > 0:
+        axd = ax.twinx()
+        axd.step(t, df['queue_drops'].to_numpy(copy=False), where='post', color='crimson',
+                 linewidth=0.8, alpha=0.35, label='Queue drops')
         axd.set_ylabel('Drops', color='crimson')
         axd.tick_params(axis='y', labelcolor='crimson')
-        axd.set_ylim(0, drops.max() * 1.2)
-    else:
-        axd.set_ylabel('')
-        axd.set_yticks([])
+        axd.set_ylim(0, max_drops * 1.2)
 
     ax.set_xlabel('Time (us)')
 
-    # Format x-axis as "XXk" for thousands of microseconds
-    for a in axes:
-        a.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f'{x/1000:.0f}k' if x >= 1000 else f'{x:.0f}'))
+    # Format x-axis as "XXk" for thousands of microseconds. The axes share x,
+    # so they share its ticker and one formatter covers all four panels.
+    axes[-1].xaxis.set_major_formatter(FuncFormatter(_kfmt))
 
     plt.tight_layout()
     plt.savefig(out_path, dpi=150, bbox_inches='tight')
@@ -29,6 +29,7 @@ Figures are saved to:   figures/
 """
 
 import argparse
+import hashlib
 import os
 import subprocess
 import sys
@@ -43,10 +44,13 @@ CMAKE_SOURCE_DIR = REPO_ROOT / "htsim" / "sim"  # CMakeLists.txt lives here
 BUILD_DIR = REPO_ROOT / "build"
 CM_DIR = SCRIPT_DIR / "connection_matrices"
 RESULTS_DIR = SCRIPT_DIR / "results" / "deep_dive"
+LOG_DIR = RESULTS_DIR / "logs"
 FIGURES_DIR = SCRIPT_DIR / "figures"
 TOPO_DIR = SCRIPT_DIR / "topologies"
 GEN_INCAST = CM_DIR / "gen_incast.py"
 GEN_PERM = CM_DIR / "gen_permutation.py"
+GEN_MIXED = SCRIPT_DIR / "gen_mixed_traffic.py"
+TM_CACHE_DIR = CM_DIR / ".cache"
 
 # Default simulation parameters
 NODES = 128
@@ -87,46 +91,112 @@ def build_simulator(build_dir, jobs):
             print(f"[BUILD] {binary} ready at {path}")
 
 
+def run_generator(gen_script, args, outputs):
+    """Run a gen_*.py script that writes outputs, memoised across experiments.
+
+    Outputs are cached under TM_CACHE_DIR, keyed by a hash of the script path,
+    its mtime and its arguments (with the output paths themselves left out),
+    so the same matrix requested by another experiment is copied, not rerun.
+    Cached files are stored by output position, so a hit does not depend on
+    the output file names.
+    """
+    outputs = [Path(o) for o in outputs]
+    out_pos = {str(o): i for i, o in enumerate(outputs)}
+    key = hashlib.blake2b(digest_size=16)
+    key.update(f"{gen_script}:{os.path.getmtime(gen_script)}".encode())
+    for a in args:
+        a = str(a)
+        key.update(b"\0" + (f"<out{out_pos[a]}>" if a in out_pos else a).encode())
+    cache_dir = TM_CACHE_DIR / key.hexdigest()
+    cached = [cache_dir / str(i) for i in range(len(outputs))]
+
+    if all(c.exists() for c in cached):
+        for c, o in zip(cached, outputs):
+            print(f"  [TM] Reusing cached {o}")
+            shutil.copyfile(c, o)
+        return
+
+    for o in outputs:
+        print(f"  [TM] Generating {o}")
+    cmd = ["python3", str(gen_script)] + [str(a) for a in args]
+    subprocess.run(cmd, check=True)
+    ensure_dir(cache_dir)
+    for c, o in zip(cached, outputs):
+        shutil.copyfile(o, c)
+
+
 def gen_traffic_matrix(tm_path, gen_script, args):
     """Generate a traffic matrix file using a gen_*.py script."""
     if Path(tm_path).exists():
         print(f"  [TM] Reusing existing {tm_path}")
         return
-    cmd = ["python3", str(gen_script)] + [str(a) for a in args]
-    print(f"  [TM] Generating {tm_path}")
-    subprocess.run(cmd, check=True)
+    run_generator(gen_script, args, [tm_path])
+
+
+def gen_mixed_traffic_matrices():
+    """Generate the mixed-experiment scenarios A/B/C with gen_mixed_traffic.py."""
+    scenarios = {
+        "A": CM_DIR / f"mixed_scenA_perm_{NODES}n_2MB.cm",
+        "B": CM_DIR / f"mixed_scenB_mixed_{NODES}n_256c.cm",
+        "C": CM_DIR / f"mixed_scenC_incast_{NODES}n.cm",
+    }
+    run_generator(GEN_MIXED, ["--nodes", NODES, "--outdir", CM_DIR, "--seed", SEED],
+                  list(scenarios.values()))
+    return scenarios
+
+
+def log_tail(fh, nbytes=500):
+    """Return the last nbytes of an open binary log file as text."""
+    size = fh.seek(0, os.SEEK_END)
+    fh.seek(max(0, size - nbytes))
+    return fh.read().decode(errors="replace")
 
 
 def run_sim(binary, args, label, cwd=None):
-    """Run a simulation binary with arguments, return (label, returncode, stdout_snippet)."""
+    """Run a simulation binary with arguments, return (label, returncode, output_snippet).
+
+    stdout and stderr are streamed to LOG_DIR/<label>.log rather than held in
+    memory; only the last 500 bytes are read back for the snippet.
+    """
     binary_path = SCRIPT_DIR / binary
     if not binary_path.exists():
         # Try build directory
         binary_path = BUILD_DIR / "datacenter" / binary
     cmd = [str(binary_path)] + [str(a) for a in args]
     print(f"  [RUN] {label}: {' '.join(cmd[:6])}...")
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True,
-                                timeout=300, cwd=cwd or str(SCRIPT_DIR))
-        if result.returncode != 0:
-            print(f"  [ERR] {label} failed (rc={result.returncode})")
-            print(f"         stderr: {result.stderr[:500]}")
-        return label, result.returncode, result.stdout[-500:] if result.stdout else ""
-    except subprocess.TimeoutExpired:
-        print(f"  [ERR] {label} timed out after 300s")
-        return label, -1, "TIMEOUT"
+    ensure_dir(LOG_DIR)
+    log_path = LOG_DIR / f"{label}.log"
+    with open(log_path, "w+b") as fh:
+        proc = subprocess.Popen(cmd, stdout=fh, stderr=subprocess.STDOUT,
+                                cwd=cwd or str(SCRIPT_DIR))
+        try:
+            rc = proc.wait(timeout=300)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            print(f"  [ERR] {label} timed out after 300s (log: {log_path})")
+            return label, -1, "TIMEOUT"
+        tail = log_tail(fh)
+    if rc != 0:
+        print(f"  [ERR] {label} failed (rc={rc}), log: {log_path}")
+        print(f"         output tail: {tail}")
+    return label, rc, tail
 
 
 def run_sim_task(task):
-    """Wrapper for Pool.map."""
+    """Wrapper for Pool.imap_unordered."""
     return run_sim(*task)
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # EXPERIMENT DEFINITIONS
+#
+# Each exp_* function generates its traffic matrices and returns its
+# simulations as (binary, args, label) tasks; main() runs the tasks of all
+# requested experiments through one shared pool.
 # ═══════════════════════════════════════════════════════════════════════
 
-def exp_fairness(parallel_jobs=4):
+def exp_fairness():
     """Fairness vs flow count: N=8,16,32,64,128 permutation flows."""
     print("\n[EXP] Fairness vs Flow Count (Section 3)")
     exp_dir = RESULTS_DIR / "fairness"
@@ -147,15 +217,10 @@ def exp_fairness(parallel_jobs=4):
             "-csv", str(csv_path),
         ], f"fairness_{n_flows}f"))
 
-    with Pool(min(parallel_jobs, len(tasks))) as pool:
-        results = pool.map(run_sim_task, tasks)
+    return tasks
 
-    for label, rc, _ in results:
-        status = "OK" if rc == 0 else "FAIL"
-        print(f"  [{status}] {label}")
 
-
-def exp_qa_gate(parallel_jobs=4):
+def exp_qa_gate():
     """QA gate sensitivity: qa_gate=0..4 under 32-to-1 incast."""
     print("\n[EXP] QA Gate Sensitivity (Section 5)")
     exp_dir = RESULTS_DIR / "qa_gate"
@@ -177,15 +242,10 @@ def exp_qa_gate(parallel_jobs=4):
             "-csv", str(csv_path),
         ], f"qa_gate_{qa}"))
 
-    with Pool(min(parallel_jobs, len(tasks))) as pool:
-        results = pool.map(run_sim_task, tasks)
-
-    for label, rc, _ in results:
-        status = "OK" if rc == 0 else "FAIL"
-        print(f"  [{status}] {label}")
+    return tasks
 
 
-def exp_incast_degree(parallel_jobs=4):
+def exp_incast_degree():
     """Incast degree: N=8,16,32,64 senders to 1 receiver."""
     print("\n[EXP] Incast Degree Sweep (Section 5)")
     exp_dir = RESULTS_DIR / "incast_degree"
@@ -206,15 +266,10 @@ def exp_incast_degree(parallel_jobs=4):
             "-csv", str(csv_path),
         ], f"incast_{degree}to1"))
 
-    with Pool(min(parallel_jobs, len(tasks))) as pool:
-        results = pool.map(run_sim_task, tasks)
+    return tasks
 
-    for label, rc, _ in results:
-        status = "OK" if rc == 0 else "FAIL"
-        print(f"  [{status}] {label}")
 
-
-def exp_target_delay(parallel_jobs=4):
+def exp_target_delay():
     """Target delay sensitivity: target_q_delay=3,5,7,9us."""
     print("\n[EXP] Target Delay Sensitivity (Section 4/7)")
     exp_dir = RESULTS_DIR / "target_delay"
@@ -236,32 +291,17 @@ def exp_target_delay(parallel_jobs=4):
             "-csv", str(csv_path),
         ], f"target_delay_{delay_us}us"))
 
-    with Pool(min(parallel_jobs, len(tasks))) as pool:
-        results = pool.map(run_sim_task, tasks)
-
-    for label, rc, _ in results:
-        status = "OK" if rc == 0 else "FAIL"
-        print(f"  [{status}] {label}")
+    return tasks
 
 
-def exp_coexistence(parallel_jobs=4):
+def exp_coexistence():
     """NSCC vs TCP Cubic coexistence: nscc_ratio sweep for scenarios A,B,C."""
     print("\n[EXP] NSCC vs Cubic Coexistence (Section 9)")
     exp_dir = RESULTS_DIR / "coexistence"
     ensure_dir(exp_dir)
 
     # Generate traffic matrices using gen_mixed_traffic.py
-    gen_script = SCRIPT_DIR / "gen_mixed_traffic.py"
-    subprocess.run(["python3", str(gen_script),
-                    "--nodes", str(NODES),
-                    "--outdir", str(CM_DIR),
-                    "--seed", str(SEED)], check=True)
-
-    scenarios = {
-        "A": CM_DIR / f"mixed_scenA_perm_{NODES}n_2MB.cm",
-        "B": CM_DIR / f"mixed_scenB_mixed_{NODES}n_256c.cm",
-        "C": CM_DIR / f"mixed_scenC_incast_{NODES}n.cm",
-    }
+    scenarios = gen_mixed_traffic_matrices()
 
     tasks = []
     for ratio_pct in [0, 25, 50, 75, 100]:
@@ -276,15 +316,10 @@ def exp_coexistence(parallel_jobs=4):
                 "-ecn",
             ], f"coexist_{scen_name}_r{ratio_pct}"))
 
-    with Pool(min(parallel_jobs, len(tasks))) as pool:
-        results = pool.map(run_sim_task, tasks)
+    return tasks
 
-    for label, rc, _ in results:
-        status = "OK" if rc == 0 else "FAIL"
-        print(f"  [{status}] {label}")
 
-
-def exp_traffic_pattern(parallel_jobs=4):
+def exp_traffic_pattern():
     """Traffic pattern comparison: permutation, incast, and mixed."""
     print("\n[EXP] Traffic Pattern Comparison (Section 10)")
     exp_dir = RESULTS_DIR / "traffic_pattern"
@@ -301,12 +336,7 @@ def exp_traffic_pattern(parallel_jobs=4):
                        [str(tm_incast), NODES, 32, FLOW_SIZE, 0, SEED, 0])
 
     # Mixed: reuse scenario B from coexistence
-    gen_script = SCRIPT_DIR / "gen_mixed_traffic.py"
-    subprocess.run(["python3", str(gen_script),
-                    "--nodes", str(NODES),
-                    "--outdir", str(CM_DIR),
-                    "--seed", str(SEED)], check=True)
-    tm_mixed = CM_DIR / f"mixed_scenB_mixed_{NODES}n_256c.cm"
+    tm_mixed = gen_mixed_traffic_matrices()["B"]
 
     tasks = []
     for pattern, tm in [("permutation", tm_perm), ("incast", tm_incast), ("mixed", tm_mixed)]:
@@ -318,12 +348,7 @@ def exp_traffic_pattern(parallel_jobs=4):
             "-csv", str(csv_path),
         ], f"pattern_{pattern}"))
 
-    with Pool(min(parallel_jobs, len(tasks))) as pool:
-        results = pool.map(run_sim_task, tasks)
-
-    for label, rc, _ in results:
-        status = "OK" if rc == 0 else "FAIL"
-        print(f"  [{status}] {label}")
+    return tasks
 
 
 # ── Phase 2: Time-Series Trace Experiments ─────────────────────────────
@@ -340,13 +365,13 @@ def exp_trace_quadrant():
 
     csv_path = exp_dir / "quadrant_4f.csv"
     trace_path = exp_dir / "quadrant_4f_trace.csv"
-    run_sim("htsim_uec", [
+    return [("htsim_uec", [
         "-topo", str(TOPO_FILE), "-tm", str(tm_path),
         "-end", "200", "-seed", SEED,
         "-strat", "ecmp_host",
         "-csv", str(csv_path),
         "-trace", str(trace_path),
-    ], "trace_quadrant_4f")
+    ], "trace_quadrant_4f")]
 
 
 def exp_trace_cwnd():
@@ -361,13 +386,13 @@ def exp_trace_cwnd():
 
     csv_path = exp_dir / "cwnd_16f.csv"
     trace_path = exp_dir / "cwnd_16f_trace.csv"
-    run_sim("htsim_uec", [
+    return [("htsim_uec", [
         "-topo", str(TOPO_FILE), "-tm", str(tm_path),
         "-end", "200", "-seed", SEED,
         "-strat", "ecmp_host",
         "-csv", str(csv_path),
         "-trace", str(trace_path),
-    ], "trace_cwnd_16f")
+    ], "trace_cwnd_16f")]
 
 
 def exp_trace_delay():
@@ -382,13 +407,13 @@ def exp_trace_delay():
 
     csv_path = exp_dir / "delay_32f.csv"
     trace_path = exp_dir / "delay_32f_trace.csv"
-    run_sim("htsim_uec", [
+    return [("htsim_uec", [
         "-topo", str(TOPO_FILE), "-tm", str(tm_path),
         "-end", "200", "-seed", SEED,
         "-strat", "ecmp_host",
         "-csv", str(csv_path),
         "-trace", str(trace_path),
-    ], "trace_delay_32f")
+    ], "trace_delay_32f")]
 
 
 def exp_trace_qa():
@@ -403,13 +428,13 @@ def exp_trace_qa():
 
     csv_path = exp_dir / "qa_64to1.csv"
     trace_path = exp_dir / "qa_64to1_trace.csv"
-    run_sim("htsim_uec", [
+    return [("htsim_uec", [
         "-topo", str(TOPO_FILE), "-tm", str(tm_path),
         "-end", "200", "-seed", SEED,
         "-strat", "ecmp_host",
         "-csv", str(csv_path),
         "-trace", str(trace_path),
-    ], "trace_qa_64to1")
+    ], "trace_qa_64to1")]
 
 
 def exp_trace_coexist():
@@ -419,23 +444,18 @@ def exp_trace_coexist():
     ensure_dir(exp_dir)
 
     # Use scenario A (permutation, uniform)
-    gen_script = SCRIPT_DIR / "gen_mixed_traffic.py"
-    subprocess.run(["python3", str(gen_script),
-                    "--nodes", str(NODES),
-                    "--outdir", str(CM_DIR),
-                    "--seed", str(SEED)], check=True)
-    tm_path = CM_DIR / f"mixed_scenA_perm_{NODES}n_2MB.cm"
+    tm_path = gen_mixed_traffic_matrices()["A"]
 
     csv_path = exp_dir / "coexist_50_50.csv"
     trace_path = exp_dir / "coexist_50_50_trace.csv"
-    run_sim("htsim_mixed", [
+    return [("htsim_mixed", [
         "-topo", str(TOPO_FILE), "-tm", str(tm_path),
         "-end", "200", "-seed", SEED,
         "-nscc_ratio", "0.5",
         "-csv", str(csv_path),
         "-trace", str(trace_path),
         "-ecn",
-    ], "trace_coexist_50_50")
+    ], "trace_coexist_50_50")]
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -469,7 +489,7 @@ def main():
     parser.add_argument("--skip-build", action="store_true",
                         help="Skip building the simulator")
     parser.add_argument("--parallel", "-p", type=int, default=4,
-                        help="Max parallel simulations per experiment")
+                        help="Max parallel simulations")
     args = parser.parse_args()
 
     ensure_dir(RESULTS_DIR)
@@ -487,18 +507,21 @@ def main():
     print(f"Running {len(exp_list)} experiment(s): {', '.join(exp_list)}")
     print(f"{'='*60}")
 
+    all_tasks = []
     for exp_name in exp_list:
         if exp_name not in EXPERIMENTS:
             print(f"[WARN] Unknown experiment: {exp_name}")
             continue
-        func = EXPERIMENTS[exp_name]
-        # Phase 1 experiments accept parallel_jobs, Phase 2 trace experiments don't
-        import inspect
-        sig = inspect.signature(func)
-        if 'parallel_jobs' in sig.parameters:
-            func(parallel_jobs=args.parallel)
-        else:
-            func()
+        all_tasks.extend(EXPERIMENTS[exp_name]())
+
+    # One pool across all experiments; imap_unordered keeps every worker busy
+    # instead of waiting for the slowest simulation of each experiment.
+    if all_tasks:
+        print(f"\n[RUN] {len(all_tasks)} simulation(s) on {min(args.parallel, len(all_tasks))} worker(s)")
+        with Pool(min(args.parallel, len(all_tasks))) as pool:
+            for label, rc, _ in pool.imap_unordered(run_sim_task, all_tasks):
+                status = "OK" if rc == 0 else "FAIL"
+                print(f"  [{status}] {label}")
 
     print(f"\n{'='*60}")
     print(f"All experiments complete.")